@@ -3,9 +3,13 @@ Story Hub - A Flask blog application with admin functionality.
 """
 import os
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from flask_wtf.csrf import CSRFProtect
 from config import Config
+from extensions import cache
+from json_provider import OrjsonProvider
 from models import close_db, init_db
+from utils import strip_html_tags
 
 
 def create_app():
@@ -13,9 +17,15 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # Serialize JSON responses with orjson
+    app.json = OrjsonProvider(app)
+    
     # Initialize CSRF protection
     csrf = CSRFProtect(app)
     
+    # Initialize caching
+    cache.init_app(app)
+    
     # Initialize CLI commands
     from cli import init_cli
     init_cli(app)
@@ -24,12 +34,20 @@ def create_app():
     from migrations.migration import migration_manager
     migration_manager.init_app(app)
     
+    # Outside debug mode templates never change on disk: skip the reload
+    # checks and keep compiled bytecode across worker restarts
+    if not app.debug:
+        app.jinja_env.auto_reload = False
+        cache_dir = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    
     # Add custom template filters
     @app.template_filter('striptags')
     def strip_tags(text):
         """Remove HTML tags from text."""
-        import re
-        return re.sub('<[^<]+?>', '', text)
+        return strip_html_tags(text)
     
     @app.template_filter('image_position')
     def image_position(x, y):
@@ -107,7 +125,6 @@ def create_app():
         """Track page views for analytics."""
         from flask import request, g
         from models import AnalyticsModel
-        import re
         
         # Skip tracking for admin pages, static files, and API endpoints
         if (request.endpoint and 
@@ -9,3 +9,10 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'static/uploads'
     DEBUG = os.environ.get('FLASK_ENV') == 'development'
+    # SimpleCache is per process: with several workers, writes only clear the
+    # cache of the worker that handled them. Multi-worker deployments should
+    # set CACHE_REDIS_URL (or CACHE_TYPE=RedisCache) to share one cache.
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'RedisCache' if CACHE_REDIS_URL else 'SimpleCache')
+    CACHE_DEFAULT_TIMEOUT = 60
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')  # Defaults to a temp directory
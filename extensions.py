@@ -0,0 +1,9 @@
+"""
+Flask extension instances for the Story Hub application.
+
+Extensions are created here without an app and bound in ``create_app`` so
+that models and routes can import them without circular imports.
+"""
+from flask_caching import Cache
+
+cache = Cache()
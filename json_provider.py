@@ -0,0 +1,35 @@
+"""
+orjson-backed JSON provider for the Story Hub application.
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson.
+
+    Dates are passed through to Flask's default handler so responses keep
+    the same format as the stdlib provider. Calls using options orjson
+    doesn't support (e.g. a custom encoder class) fall back to the stdlib.
+    """
+    
+    _SUPPORTED_KWARGS = {'default', 'sort_keys', 'indent', 'separators'}
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string."""
+        if not kwargs.keys() <= self._SUPPORTED_KWARGS:
+            return super().dumps(obj, **kwargs)
+        
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize data from a JSON string or bytes."""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,65 @@
+"""
+Migration: Posts Full-Text Search
+Description: Add an FTS5 index over post titles, excerpts and content
+Created: 2026-10-15 09:00:00
+"""
+from migrations.migration import Migration
+
+
+class PostsFullTextSearchMigration(Migration):
+    """
+    Add an FTS5 index over post titles, excerpts and content
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.description = "Add an FTS5 index over post titles, excerpts and content"
+    
+    def up(self, db):
+        """Apply the migration."""
+        
+        # External-content FTS table backed by posts
+        self.execute_sql(db, '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                title, excerpt, content,
+                content='posts', content_rowid='id'
+            )
+        ''')
+        
+        # Keep the index in sync with the posts table
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts (rowid, title, excerpt, content)
+                VALUES (new.id, new.title, new.excerpt, new.content);
+            END
+        ''')
+        
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+                VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+            END
+        ''')
+        
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, excerpt, content ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+                VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+                INSERT INTO posts_fts (rowid, title, excerpt, content)
+                VALUES (new.id, new.title, new.excerpt, new.content);
+            END
+        ''')
+        
+        # Index existing posts
+        self.execute_sql(db, "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    
+    def down(self, db):
+        """Rollback the migration."""
+        
+        # Drop triggers first
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS posts_fts_ai')
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS posts_fts_ad')
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS posts_fts_au')
+        
+        # Drop the index table
+        self.execute_sql(db, 'DROP TABLE IF EXISTS posts_fts')
@@ -0,0 +1,61 @@
+"""
+Migration: Tag Post Counts
+Description: Maintain a post_count column on tags with triggers
+Created: 2026-10-15 10:00:00
+"""
+from migrations.migration import Migration
+
+
+class TagPostCountsMigration(Migration):
+    """
+    Maintain a post_count column on tags with triggers
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.description = "Maintain a post_count column on tags with triggers"
+    
+    def up(self, db):
+        """Apply the migration."""
+        
+        if not self.column_exists(db, 'tags', 'post_count'):
+            self.execute_sql(db, 'ALTER TABLE tags ADD COLUMN post_count INTEGER NOT NULL DEFAULT 0')
+        
+        # Foreign keys are not enforced, so remove a deleted post's tag links explicitly
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS posts_delete_post_tags AFTER DELETE ON posts BEGIN
+                DELETE FROM post_tags WHERE post_id = old.id;
+            END
+        ''')
+        
+        # Keep the counts in sync with post_tags
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS post_tags_count_ai AFTER INSERT ON post_tags BEGIN
+                UPDATE tags SET post_count = post_count + 1 WHERE id = new.tag_id;
+            END
+        ''')
+        
+        self.execute_sql(db, '''
+            CREATE TRIGGER IF NOT EXISTS post_tags_count_ad AFTER DELETE ON post_tags BEGIN
+                UPDATE tags SET post_count = post_count - 1 WHERE id = old.tag_id;
+            END
+        ''')
+        
+        # Drop links to posts that no longer exist and backfill the counts
+        self.execute_sql(db, 'DELETE FROM post_tags WHERE post_id NOT IN (SELECT id FROM posts)')
+        self.execute_sql(db, '''
+            UPDATE tags SET post_count = (
+                SELECT COUNT(*) FROM post_tags pt WHERE pt.tag_id = tags.id
+            )
+        ''')
+    
+    def down(self, db):
+        """Rollback the migration."""
+        
+        # Drop triggers first
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS posts_delete_post_tags')
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS post_tags_count_ai')
+        self.execute_sql(db, 'DROP TRIGGER IF EXISTS post_tags_count_ad')
+        
+        if self.column_exists(db, 'tags', 'post_count'):
+            self.execute_sql(db, 'ALTER TABLE tags DROP COLUMN post_count')
@@ -0,0 +1,43 @@
+"""
+Migration: Listing Indexes
+Description: Add indexes for published post listings and tag lookups
+Created: 2026-10-15 11:00:00
+"""
+from migrations.migration import Migration
+
+
+class ListingIndexesMigration(Migration):
+    """
+    Add indexes for published post listings and tag lookups
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.description = "Add indexes for published post listings and tag lookups"
+    
+    def up(self, db):
+        """Apply the migration."""
+        
+        # Listings filter on status and sort newest first
+        self.execute_sql(db, '''
+            CREATE INDEX IF NOT EXISTS idx_posts_status_created 
+            ON posts (status, created_at DESC)
+        ''')
+        
+        self.execute_sql(db, '''
+            CREATE INDEX IF NOT EXISTS idx_posts_category_status_created 
+            ON posts (category_id, status, created_at DESC)
+        ''')
+        
+        # post_tags is keyed by (post_id, tag_id); tag pages look up by tag first
+        self.execute_sql(db, '''
+            CREATE INDEX IF NOT EXISTS idx_post_tags_tag_post 
+            ON post_tags (tag_id, post_id)
+        ''')
+    
+    def down(self, db):
+        """Rollback the migration."""
+        
+        self.execute_sql(db, 'DROP INDEX IF EXISTS idx_posts_status_created')
+        self.execute_sql(db, 'DROP INDEX IF EXISTS idx_posts_category_status_created')
+        self.execute_sql(db, 'DROP INDEX IF EXISTS idx_post_tags_tag_post')
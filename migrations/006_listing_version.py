@@ -0,0 +1,51 @@
+"""
+Migration: Listing Version
+Description: Keep a listing version counter bumped by triggers on post, tag and category writes
+Created: 2026-10-15 12:00:00
+"""
+from migrations.migration import Migration
+
+# Tables whose writes change what the sitemap, feeds and post pages show
+_VERSIONED_TABLES = ('posts', 'categories', 'tags', 'post_tags')
+_EVENTS = ('insert', 'update', 'delete')
+
+
+class ListingVersionMigration(Migration):
+    """
+    Keep a listing version counter bumped by triggers on post, tag and category writes
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.description = "Keep a listing version counter bumped by triggers on post, tag and category writes"
+    
+    def up(self, db):
+        """Apply the migration."""
+        
+        # A single row shared by every worker through the database
+        self.execute_sql(db, '''
+            CREATE TABLE IF NOT EXISTS listing_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.execute_sql(db, 'INSERT OR IGNORE INTO listing_version (id, version) VALUES (1, 0)')
+        
+        for table in _VERSIONED_TABLES:
+            for event in _EVENTS:
+                self.execute_sql(db, f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_listing_version_{event[0]}
+                    AFTER {event.upper()} ON {table} BEGIN
+                        UPDATE listing_version SET version = version + 1 WHERE id = 1;
+                    END
+                ''')
+    
+    def down(self, db):
+        """Rollback the migration."""
+        
+        # Drop triggers first
+        for table in _VERSIONED_TABLES:
+            for event in _EVENTS:
+                self.execute_sql(db, f'DROP TRIGGER IF EXISTS {table}_listing_version_{event[0]}')
+        
+        self.execute_sql(db, 'DROP TABLE IF EXISTS listing_version')
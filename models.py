@@ -1,9 +1,17 @@
 """
 Database models and functions for the Story Hub application.
 """
+import atexit
+import json
+import logging
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from flask import g, current_app
 from werkzeug.security import generate_password_hash
+from extensions import cache
 
 
 def get_db():
@@ -15,6 +23,35 @@ def get_db():
     return db
 
 
+@contextmanager
+def transaction():
+    """Group several writes into a single commit, rolling back on error."""
+    db = get_db()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def invalidate_listing_cache():
+    """Drop memoized category, tag and template listings after a write."""
+    cache.delete_memoized(CategoryModel.get_all_categories)
+    cache.delete_memoized(CategoryModel.get_categories_with_posts)
+    cache.delete_memoized(TagModel.get_tags_with_posts)
+    cache.delete_memoized(PostTemplateModel.get_all_templates)
+
+
+def get_listing_version():
+    """Get a counter that changes whenever posts, tags or categories are written.
+    
+    Triggers bump it in the database, so every worker sees the same value.
+    """
+    db = get_db()
+    return db.execute('SELECT version FROM listing_version WHERE id = 1').fetchone()[0]
+
+
 def close_db(exception):
     """Close database connection."""
     db = getattr(g, '_database', None)
@@ -432,14 +469,18 @@ class PostModel:
             return db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
     
     @staticmethod
-    def get_featured_post():
-        """Get the currently featured post."""
+    def get_last_modified():
+        """Get the latest update or go-live time across published posts.
+        
+        Scheduled posts count from their publish date, so the value moves
+        forward when one goes live.
+        """
         db = get_db()
         return db.execute('''
-            SELECT * FROM posts 
-            WHERE featured = 1 
-            LIMIT 1
-        ''').fetchone()
+            SELECT MAX(MAX(COALESCE(updated_at, created_at)), MAX(COALESCE(publish_date, created_at))) FROM posts
+            WHERE status = 'published'
+            AND (publish_date IS NULL OR publish_date <= CURRENT_TIMESTAMP)
+        ''').fetchone()[0]
     
     @staticmethod
     def get_introduction_post():
@@ -475,6 +516,36 @@ class PostModel:
         db = get_db()
         return db.execute('SELECT * FROM posts WHERE slug = ?', (slug,)).fetchone()
     
+    @staticmethod
+    def _get_post_with_tags(where_clause, value):
+        """Get a single post and its tags (sorted by name) in one query."""
+        db = get_db()
+        row = db.execute(f'''
+            SELECT p.*,
+                   (SELECT json_group_array(json_object('id', pt_tags.id, 'name', pt_tags.name, 'slug', pt_tags.slug))
+                    FROM (
+                        SELECT t.id, t.name, t.slug FROM tags t
+                        JOIN post_tags pt ON t.id = pt.tag_id
+                        WHERE pt.post_id = p.id
+                        ORDER BY t.name
+                    ) pt_tags) AS tags_json
+            FROM posts p
+            WHERE {where_clause}
+        ''', (value,)).fetchone()
+        if row is None:
+            return None, []
+        return row, json.loads(row['tags_json'])
+    
+    @staticmethod
+    def get_post_with_tags_by_slug(slug):
+        """Get a post by its slug together with its tags."""
+        return PostModel._get_post_with_tags('p.slug = ?', slug)
+    
+    @staticmethod
+    def get_post_with_tags_by_id(post_id):
+        """Get a post by its ID together with its tags."""
+        return PostModel._get_post_with_tags('p.id = ?', post_id)
+    
     @staticmethod
     def create_post(title, content, excerpt, image_filename, post_type, slug, image_position_x='center', image_position_y='center', category_id=None, status='published', publish_date=None, template_id=None, meta_description=None, meta_keywords=None, canonical_url=None):
         """Create a new post."""
@@ -484,6 +555,7 @@ class PostModel:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (title, content, excerpt, image_filename, image_position_x, image_position_y, post_type, slug, category_id, status, publish_date, template_id, meta_description, meta_keywords, canonical_url))
         db.commit()
+        invalidate_listing_cache()
         return cursor.lastrowid
     
     @staticmethod
@@ -496,6 +568,7 @@ class PostModel:
             WHERE id = ?
         ''', (title, content, excerpt, image_filename, image_position_x, image_position_y, post_type, slug, category_id, status, publish_date, template_id, meta_description, meta_keywords, canonical_url, post_id))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def delete_post(post_id):
@@ -503,6 +576,7 @@ class PostModel:
         db = get_db()
         db.execute('DELETE FROM posts WHERE id = ?', (post_id,))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def feature_post(post_id):
@@ -532,77 +606,143 @@ class PostModel:
         return result is not None
     
     @staticmethod
-    def count_all_posts():
-        """Count total number of posts."""
-        db = get_db()
-        return db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
-    
-    @staticmethod
-    def count_non_featured_posts():
-        """Count total number of non-featured posts."""
+    def get_colliding_slugs(base_slug, exclude_id=None):
+        """Get the set of post slugs equal to base_slug or of the form base_slug-N."""
         db = get_db()
-        return db.execute('SELECT COUNT(*) FROM posts WHERE featured = 0').fetchone()[0]
+        # GLOB keeps other slugs sharing the prefix (e.g. base-slug-extra) out of the result
+        query = "SELECT slug FROM posts WHERE (slug = ? OR slug GLOB ? || '-[0-9]*')"
+        params = [base_slug, base_slug]
+        if exclude_id:
+            query += ' AND id != ?'
+            params.append(exclude_id)
+        return {row['slug'] for row in db.execute(query, params).fetchall()}
     
     @staticmethod
-    def get_all_posts_paginated(page, per_page):
-        """Get paginated posts."""
+    def home_page_bundle(page, per_page):
+        """Get the featured post, introduction post and a page of listing posts in one query.
+
+        When a post is featured, the listing excludes it; otherwise it covers all posts.
+        """
         db = get_db()
         offset = (page - 1) * per_page
-        return db.execute('''
-            SELECT * FROM posts 
-            ORDER BY created_at DESC 
-            LIMIT ? OFFSET ?
+        rows = db.execute('''
+            WITH listing AS (
+                SELECT * FROM posts
+                WHERE featured = 0
+                OR NOT EXISTS (SELECT 1 FROM posts WHERE featured = 1)
+            ),
+            total AS (SELECT COUNT(*) AS n FROM listing)
+            SELECT 'featured' AS bundle_kind, (SELECT n FROM total) AS bundle_total, f.*
+            FROM (SELECT * FROM posts WHERE featured = 1 LIMIT 1) f
+            UNION ALL
+            SELECT 'introduction', (SELECT n FROM total), i.*
+            FROM (
+                SELECT p.* FROM posts p
+                JOIN categories c ON p.category_id = c.id
+                WHERE c.slug = 'introduction'
+                LIMIT 1
+            ) i
+            UNION ALL
+            SELECT 'page', (SELECT n FROM total), l.*
+            FROM (SELECT * FROM listing ORDER BY created_at DESC LIMIT ? OFFSET ?) l
+            UNION ALL
+            SELECT 'total', (SELECT n FROM total), e.*
+            FROM (SELECT 1) LEFT JOIN posts e ON 0
+            -- A compound select keeps no branch's order, so sort the page here
+            ORDER BY bundle_kind, created_at DESC
         ''', (per_page, offset)).fetchall()
-    
+
+        bundle = {'featured_post': None, 'introduction_post': None, 'posts': [], 'total_posts': 0}
+        for row in rows:
+            kind = row['bundle_kind']
+            if kind == 'featured':
+                bundle['featured_post'] = row
+            elif kind == 'introduction':
+                bundle['introduction_post'] = row
+            elif kind == 'page':
+                bundle['posts'].append(row)
+            else:
+                bundle['total_posts'] = row['bundle_total']
+        return bundle
+
     @staticmethod
-    def get_non_featured_posts_paginated(page, per_page):
-        """Get paginated non-featured posts."""
-        db = get_db()
-        offset = (page - 1) * per_page
-        return db.execute('''
-            SELECT * FROM posts 
-            WHERE featured = 0
-            ORDER BY created_at DESC 
-            LIMIT ? OFFSET ?
-        ''', (per_page, offset)).fetchall()
+    def _text_match_clause(query, columns=('title', 'content', 'excerpt')):
+        """Build a WHERE fragment matching posts against the text query.
+
+        Uses the posts_fts index (prefix match per word) when it exists,
+        falling back to LIKE scans until the FTS migration has been applied.
+        """
+        db = get_db()
+        has_fts = getattr(g, '_has_posts_fts', None)
+        if has_fts is None:
+            has_fts = g._has_posts_fts = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+            ).fetchone() is not None
+        
+        if has_fts:
+            # Quote each word so user input can't inject FTS5 query syntax
+            terms = ' '.join('"' + word.replace('"', '""') + '"*' for word in query.split())
+            if not terms:
+                return '0', []
+            return (
+                'p.id IN (SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?)',
+                ['{' + ' '.join(columns) + '} : (' + terms + ')']
+            )
+        
+        search_term = f'%{query}%'
+        return '(' + ' OR '.join(f'p.{column} LIKE ?' for column in columns) + ')', [search_term] * len(columns)
     
     @staticmethod
     def search_posts(query, page=1, per_page=10):
-        """Search posts by title, content, or excerpt."""
+        """Search posts by title, content, or excerpt, selecting only the columns the quick search needs.
+
+        Returns a ``(rows, total)`` tuple; the total comes from a window count in the same query.
+        """
         db = get_db()
         offset = (page - 1) * per_page
-        search_term = f'%{query}%'
+        match_clause, match_params = PostModel._text_match_clause(query)
         
-        return db.execute('''
-            SELECT DISTINCT p.*, GROUP_CONCAT(t.name, ', ') as tag_names
+        rows = db.execute(f'''
+            SELECT p.id, p.title, p.slug, p.excerpt, p.image_filename, p.created_at,
+                   c.name as category_name,
+                   COUNT(*) OVER () as total_count
             FROM posts p
-            LEFT JOIN post_tags pt ON p.id = pt.post_id
-            LEFT JOIN tags t ON pt.tag_id = t.id
-            WHERE p.title LIKE ? OR p.content LIKE ? OR p.excerpt LIKE ?
-            GROUP BY p.id
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE {match_clause}
             ORDER BY p.created_at DESC
             LIMIT ? OFFSET ?
-        ''', (search_term, search_term, search_term, per_page, offset)).fetchall()
+        ''', (*match_params, per_page, offset)).fetchall()
+        
+        if rows:
+            return rows, rows[0]['total_count']
+        # Past the last page there is no row to carry the window count
+        return rows, PostModel.count_search_results(query) if page > 1 else 0
     
     @staticmethod
     def count_search_results(query):
         """Count search results."""
         db = get_db()
-        search_term = f'%{query}%'
-        return db.execute('''
+        match_clause, match_params = PostModel._text_match_clause(query)
+        return db.execute(f'''
             SELECT COUNT(DISTINCT p.id) FROM posts p
-            WHERE p.title LIKE ? OR p.content LIKE ? OR p.excerpt LIKE ?
-        ''', (search_term, search_term, search_term)).fetchone()[0]
+            WHERE {match_clause}
+        ''', match_params).fetchone()[0]
     
     @staticmethod
     def get_posts_by_tag(tag_slug, page=1, per_page=10):
-        """Get posts filtered by tag."""
+        """Get posts filtered by tag.
+
+        Returns a ``(rows, total)`` tuple; the total comes from a window count in the same query.
+        """
         db = get_db()
         offset = (page - 1) * per_page
         
-        return db.execute('''
-            SELECT DISTINCT p.*, GROUP_CONCAT(t.name, ', ') as tag_names
+        rows = db.execute('''
+            SELECT DISTINCT p.*, c.name as category_name, c.slug as category_slug,
+                   GROUP_CONCAT(t.name, ', ') as tag_names,
+                   COUNT(*) OVER () as total_count
             FROM posts p
+            LEFT JOIN categories c ON p.category_id = c.id
             JOIN post_tags pt ON p.id = pt.post_id
             JOIN tags t ON pt.tag_id = t.id
             JOIN tags filter_tag ON pt.tag_id = filter_tag.id
@@ -613,17 +753,18 @@ class PostModel:
             ORDER BY p.created_at DESC
             LIMIT ? OFFSET ?
         ''', (tag_slug, per_page, offset)).fetchall()
+        
+        if rows:
+            return rows, rows[0]['total_count']
+        # Past the last page there is no row to carry the window count
+        return rows, PostModel.count_posts_by_tag(tag_slug) if page > 1 else 0
     
     @staticmethod
     def count_posts_by_tag(tag_slug):
         """Count posts by tag."""
         db = get_db()
-        return db.execute('''
-            SELECT COUNT(DISTINCT p.id) FROM posts p
-            JOIN post_tags pt ON p.id = pt.post_id
-            JOIN tags t ON pt.tag_id = t.id
-            WHERE t.slug = ?
-        ''', (tag_slug,)).fetchone()[0]
+        row = db.execute('SELECT post_count FROM tags WHERE slug = ?', (tag_slug,)).fetchone()
+        return row['post_count'] if row else 0
     
     @staticmethod
     def get_post_tags(post_id):
@@ -636,59 +777,92 @@ class PostModel:
             ORDER BY t.name
         ''', (post_id,)).fetchall()
     
+    @staticmethod
+    def get_post_tags_csv(post_id):
+        """Get a post's tag names as a single comma-separated string."""
+        db = get_db()
+        return db.execute('''
+            SELECT GROUP_CONCAT(name, ', ') FROM (
+                SELECT t.name FROM tags t
+                JOIN post_tags pt ON t.id = pt.tag_id
+                WHERE pt.post_id = ?
+                ORDER BY t.name
+            )
+        ''', (post_id,)).fetchone()[0]
+    
     @staticmethod
     def add_tags_to_post(post_id, tag_names):
         """Add tags to a post."""
         if not tag_names:
             return
             
+        from utils import generate_tag_slug
+        
+        # Map slug -> name so repeated tags collapse to a single row
+        tags = {}
+        for tag_name in tag_names:
+            tag_name = tag_name.strip()
+            if tag_name:
+                tags.setdefault(generate_tag_slug(tag_name), tag_name)
+        
         db = get_db()
         # First, remove existing tags for this post
         db.execute('DELETE FROM post_tags WHERE post_id = ?', (post_id,))
         
-        # Process each tag
-        for tag_name in tag_names:
-            tag_name = tag_name.strip()
-            if not tag_name:
-                continue
-                
-            # Create tag if it doesn't exist
-            from utils import generate_tag_slug
-            tag_slug = generate_tag_slug(tag_name)
+        if tags:
+            # Create any missing tags in one batch
+            db.executemany('INSERT OR IGNORE INTO tags (name, slug) VALUES (?, ?)',
+                           [(name, slug) for slug, name in tags.items()])
             
-            # Insert or get tag
-            db.execute('''
-                INSERT OR IGNORE INTO tags (name, slug) VALUES (?, ?)
-            ''', (tag_name, tag_slug))
-            
-            # Get tag ID
-            tag = db.execute('SELECT id FROM tags WHERE slug = ?', (tag_slug,)).fetchone()
-            
-            # Link post to tag
-            db.execute('''
-                INSERT OR IGNORE INTO post_tags (post_id, tag_id) VALUES (?, ?)
-            ''', (post_id, tag['id']))
+            # Link the post to every tag with a single statement
+            placeholders = ', '.join('?' * len(tags))
+            db.execute(f'''
+                INSERT OR IGNORE INTO post_tags (post_id, tag_id)
+                SELECT ?, id FROM tags WHERE slug IN ({placeholders})
+            ''', [post_id, *tags])
         
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
-    def get_search_suggestions(query, limit=5):
-        """Get search suggestions from post titles."""
+    def get_suggestions_combined(query, post_limit=5, tag_limit=3):
+        """Get post title and tag name suggestions in a single query.
+        
+        Returns a ``(posts, tags)`` tuple of rows. Both share the post column
+        names, so a tag's name is in ``title``.
+        """
         db = get_db()
-        search_term = f'%{query}%'
+        match_clause, match_params = PostModel._text_match_clause(query, columns=('title',))
         
-        return db.execute('''
-            SELECT p.*, c.name as category_name
-            FROM posts p
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.title LIKE ? AND p.status = 'published'
-            ORDER BY p.created_at DESC
-            LIMIT ?
-        ''', (search_term, limit)).fetchall()
+        rows = db.execute(f'''
+            SELECT * FROM (
+                SELECT 'post' as kind, p.id, p.title, p.slug, p.excerpt, c.name as category_name, NULL as post_count
+                FROM posts p
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE {match_clause} AND p.status = 'published'
+                ORDER BY p.created_at DESC
+                LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'tag' as kind, t.id, t.name, t.slug, NULL, NULL, t.post_count
+                FROM tags t
+                WHERE t.name LIKE ?
+                ORDER BY t.post_count DESC, t.name
+                LIMIT ?
+            )
+        ''', (*match_params, post_limit, f'%{query}%', tag_limit)).fetchall()
+        
+        posts = [row for row in rows if row['kind'] == 'post']
+        tags = [row for row in rows if row['kind'] == 'tag']
+        return posts, tags
     
     @staticmethod
     def advanced_search(query, page=1, per_page=10, category_filter='', tag_filter='', date_from='', date_to='', sort_by='relevance'):
-        """Advanced search with filters and sorting."""
+        """Advanced search with filters and sorting.
+
+        Returns a ``(rows, total)`` tuple; the total comes from a window count in the same query.
+        """
         db = get_db()
         offset = (page - 1) * per_page
         search_term = f'%{query}%'
@@ -696,7 +870,8 @@ class PostModel:
         # Build the query dynamically based on filters
         base_query = '''
             SELECT DISTINCT p.*, c.name as category_name, c.slug as category_slug, 
-                   GROUP_CONCAT(t.name, ', ') as tag_names
+                   GROUP_CONCAT(t.name, ', ') as tag_names,
+                   COUNT(*) OVER () as total_count
             FROM posts p
             LEFT JOIN categories c ON p.category_id = c.id
             LEFT JOIN post_tags pt ON p.id = pt.post_id
@@ -750,7 +925,13 @@ class PostModel:
         base_query += ' LIMIT ? OFFSET ?'
         params.extend([per_page, offset])
         
-        return db.execute(base_query, params).fetchall()
+        rows = db.execute(base_query, params).fetchall()
+        if rows:
+            return rows, rows[0]['total_count']
+        # Past the last page there is no row to carry the window count
+        if page > 1:
+            return rows, PostModel.count_advanced_search(query, category_filter, tag_filter, date_from, date_to)
+        return rows, 0
     
     @staticmethod
     def count_advanced_search(query, category_filter='', tag_filter='', date_from='', date_to=''):
@@ -854,24 +1035,16 @@ class TagModel:
     def get_all_tags():
         """Get all tags."""
         db = get_db()
-        return db.execute('''
-            SELECT t.*, COUNT(pt.post_id) as post_count
-            FROM tags t
-            LEFT JOIN post_tags pt ON t.id = pt.tag_id
-            GROUP BY t.id
-            ORDER BY t.name
-        ''').fetchall()
+        return db.execute('SELECT * FROM tags ORDER BY name').fetchall()
     
     @staticmethod
     def get_popular_tags(limit=10):
         """Get most popular tags by post count."""
         db = get_db()
         return db.execute('''
-            SELECT t.*, COUNT(pt.post_id) as post_count
-            FROM tags t
-            JOIN post_tags pt ON t.id = pt.tag_id
-            GROUP BY t.id
-            ORDER BY post_count DESC, t.name
+            SELECT * FROM tags
+            WHERE post_count > 0
+            ORDER BY post_count DESC, name
             LIMIT ?
         ''', (limit,)).fetchall()
     
@@ -894,29 +1067,15 @@ class TagModel:
         db.execute('DELETE FROM post_tags WHERE tag_id = ?', (tag_id,))
         db.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
-    def get_tag_suggestions(query, limit=3):
-        """Get tag suggestions for search."""
-        db = get_db()
-        search_term = f'%{query}%'
-        
-        return db.execute('''
-            SELECT t.*, COUNT(pt.post_id) as post_count
-            FROM tags t
-            LEFT JOIN post_tags pt ON t.id = pt.tag_id
-            WHERE t.name LIKE ?
-            GROUP BY t.id
-            ORDER BY post_count DESC, t.name
-            LIMIT ?
-        ''', (search_term, limit)).fetchall()
-    
-    @staticmethod
+    @cache.memoize(timeout=60)
     def get_tags_with_posts(limit=20):
         """Get only tags that have at least one published post."""
         db = get_db()
-        return db.execute('''
-            SELECT t.*, COUNT(pt.post_id) as post_count
+        rows = db.execute('''
+            SELECT t.id, t.name, t.slug, t.created_at, COUNT(pt.post_id) as post_count
             FROM tags t
             INNER JOIN post_tags pt ON t.id = pt.tag_id
             INNER JOIN posts p ON pt.post_id = p.id
@@ -926,22 +1085,25 @@ class TagModel:
             ORDER BY post_count DESC, t.name
             LIMIT ?
         ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
 
 
 class CategoryModel:
     """Model for handling category-related database operations."""
     
     @staticmethod
+    @cache.memoize(timeout=60)
     def get_all_categories():
         """Get all categories."""
         db = get_db()
-        return db.execute('''
+        rows = db.execute('''
             SELECT c.*, COUNT(p.id) as post_count
             FROM categories c
             LEFT JOIN posts p ON c.id = p.category_id
             GROUP BY c.id
             ORDER BY c.name
         ''').fetchall()
+        return [dict(row) for row in rows]
     
     @staticmethod
     def get_category_by_slug(slug):
@@ -964,6 +1126,7 @@ class CategoryModel:
             VALUES (?, ?, ?)
         ''', (name, slug, description))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def update_category(category_id, name, slug, description=None):
@@ -975,6 +1138,7 @@ class CategoryModel:
             WHERE id = ?
         ''', (name, slug, description, category_id))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def delete_category(category_id):
@@ -985,6 +1149,7 @@ class CategoryModel:
         # Then delete the category
         db.execute('DELETE FROM categories WHERE id = ?', (category_id,))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def slug_exists(slug, exclude_id=None):
@@ -997,10 +1162,11 @@ class CategoryModel:
         return result is not None
     
     @staticmethod
+    @cache.memoize(timeout=60)
     def get_categories_with_posts():
         """Get only categories that have at least one published post."""
         db = get_db()
-        return db.execute('''
+        rows = db.execute('''
             SELECT c.*, COUNT(p.id) as post_count
             FROM categories c
             INNER JOIN posts p ON c.id = p.category_id 
@@ -1009,6 +1175,7 @@ class CategoryModel:
             HAVING COUNT(p.id) > 0
             ORDER BY c.name
         ''').fetchall()
+        return [dict(row) for row in rows]
 
 
 class SocialLinksModel:
@@ -1153,14 +1320,15 @@ class ContactModel:
     """Model for handling contact messages."""
     
     @staticmethod
-    def save_message(name, email, subject, message):
+    def save_message(name, email, subject, message, commit=True):
         """Save a contact message."""
         db = get_db()
         db.execute('''
             INSERT INTO contact_messages (name, email, subject, message)
             VALUES (?, ?, ?, ?)
         ''', (name, email, subject, message))
-        db.commit()
+        if commit:
+            db.commit()
     
     @staticmethod
     def get_all_messages():
@@ -1231,10 +1399,12 @@ class PostTemplateModel:
     """Model for handling post template operations."""
     
     @staticmethod
+    @cache.memoize(timeout=60)
     def get_all_templates():
         """Get all post templates."""
         db = get_db()
-        return db.execute('SELECT * FROM post_templates ORDER BY name').fetchall()
+        rows = db.execute('SELECT * FROM post_templates ORDER BY name').fetchall()
+        return [dict(row) for row in rows]
     
     @staticmethod
     def get_template_by_id(template_id):
@@ -1251,6 +1421,7 @@ class PostTemplateModel:
             VALUES (?, ?, ?)
         ''', (name, description, content_template))
         db.commit()
+        invalidate_listing_cache()
         return cursor.lastrowid
     
     @staticmethod
@@ -1263,6 +1434,7 @@ class PostTemplateModel:
             WHERE id = ?
         ''', (name, description, content_template, template_id))
         db.commit()
+        invalidate_listing_cache()
     
     @staticmethod
     def delete_template(template_id):
@@ -1273,6 +1445,7 @@ class PostTemplateModel:
         # Then delete the template
         db.execute('DELETE FROM post_templates WHERE id = ?', (template_id,))
         db.commit()
+        invalidate_listing_cache()
 
 
 class ImageGalleryModel:
@@ -1344,19 +1517,88 @@ class ImageGalleryModel:
         ''', (search_term, search_term, search_term, per_page, offset)).fetchall()
 
 
+class ActivityLogWriter:
+    """Background writer that batches activity log inserts off the request path."""
+    
+    INSERT_SQL = '''
+        INSERT INTO activity_log (admin_username, action, details, ip_address, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    
+    def __init__(self, database, flush_interval=0.5):
+        self.database = database
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+    
+    def submit(self, entry):
+        """Queue an activity log row for the next batch."""
+        self.queue.put(entry)
+    
+    def close(self, timeout=5):
+        """Write any pending entries and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+    
+    def _run(self):
+        db = sqlite3.connect(self.database)
+        try:
+            running = True
+            while running:
+                # Block for the first entry, then gather whatever arrives within the interval
+                batch = []
+                entry = self.queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while entry is not None:
+                    batch.append(entry)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        entry = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                running = entry is not None
+                
+                if batch:
+                    try:
+                        db.executemany(self.INSERT_SQL, batch)
+                        db.commit()
+                    except sqlite3.Error:
+                        db.rollback()
+                        logging.getLogger(__name__).exception('Failed to write %d activity log entries', len(batch))
+        finally:
+            db.close()
+
+
+def get_activity_writer():
+    """Get the activity log writer for the current app, starting it on first use."""
+    writer = current_app.extensions.get('activity_log_writer')
+    if writer is None or not writer.thread.is_alive():
+        writer = current_app.extensions['activity_log_writer'] = ActivityLogWriter(current_app.config['DATABASE'])
+    return writer
+
+
 class ActivityLogModel:
     """Model for tracking admin activities."""
     
     @staticmethod
-    def log_activity(admin_username, action, details=None, ip_address=None):
-        """Log an admin activity."""
+    def log_activity(admin_username, action, details=None, ip_address=None, background=True):
+        """Log an admin activity.
+        
+        By default entries are queued and written in batches by a background
+        thread. Pass background=False to insert on the request connection
+        instead, as part of the caller's transaction; nothing is committed.
+        """
         from datetime import datetime
-        db = get_db()
-        db.execute('''
-            INSERT INTO activity_log (admin_username, action, details, ip_address, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (admin_username, action, details, ip_address, datetime.now()))
-        db.commit()
+        entry = (admin_username, action, details, ip_address, datetime.now())
+        if background:
+            get_activity_writer().submit(entry)
+        else:
+            get_db().execute(ActivityLogWriter.INSERT_SQL, entry)
     
     @staticmethod
     def get_recent_activities(limit=50):
@@ -5,7 +5,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_wtf.csrf import validate_csrf
 from models import PostModel, AdminModel, TagModel, CategoryModel, EmailConfigModel, ContactModel, AboutModel, PostTemplateModel, ImageGalleryModel, ActivityLogModel, SocialLinksModel, QuoteModel, AnalyticsModel
 from forms import DeleteForm, CategoryForm, DeleteCategoryForm, ChangePasswordForm, AboutForm, PostTemplateForm, ImageGalleryForm, ImageEditForm, ImageSearchForm, BulkDeleteForm, SocialLinkForm, DeleteSocialLinkForm, QuoteForm, DeleteQuoteForm
-from utils import admin_required, delete_file, save_uploaded_file
+from utils import admin_required, delete_file, save_uploaded_file, strip_html_tags
 import os
 import json
 import zipfile
@@ -47,8 +47,7 @@ def admin_dashboard():
             quality_stats['short_description'] += 1
             has_warnings = True
         # Strip HTML tags for content length check
-        import re
-        clean_content = re.sub('<[^<]+?>', '', post['content'] or '')
+        clean_content = strip_html_tags(post['content'] or '')
         if len(clean_content) < 200:
             quality_stats['short_content'] += 1
             has_warnings = True
@@ -2,50 +2,34 @@
 Main routes for the Story Hub application.
 """
 from flask import Blueprint, render_template, request, flash, redirect, url_for
-from models import PostModel, TagModel, CategoryModel, ContactModel, EmailConfigModel, AboutModel, ActivityLogModel, SocialLinksModel, QuoteModel
-from utils import is_admin_logged_in
+from models import PostModel, TagModel, CategoryModel, ContactModel, EmailConfigModel, AboutModel, ActivityLogModel, SocialLinksModel, QuoteModel, transaction
+from utils import is_admin_logged_in, Pagination, paginate_args
 from forms import ContactForm
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import logging
+from datetime import datetime
 
 main = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
 
 
 @main.route('/')
 def index():
     """Home page with featured post and latest posts."""
     # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    
     # Responsive pagination based on screen size
     # Default: 3 cards (desktop: 1 row), medium: 2 cards (1 row), mobile: 3 cards (3 rows)
-    per_page = request.args.get('per_page', 3, type=int)
-    
-    # Validate per_page values (allow 2 for medium screens, 3 for desktop/mobile)
-    if per_page not in [2, 3, 6]:
-        per_page = 3  # Default fallback
-    
-    # Get featured post
-    featured_post = PostModel.get_featured_post()
+    # Allow 2 for medium screens, 3 for desktop/mobile
+    page, per_page = paginate_args(3, (2, 3, 6))
     
-    # Get introduction post
-    introduction_post = PostModel.get_introduction_post()
-    
-    # Get total count of non-featured posts
-    if featured_post:
-        total_posts = PostModel.count_non_featured_posts()
-        posts = PostModel.get_non_featured_posts_paginated(page, per_page)
-    else:
-        total_posts = PostModel.count_all_posts()
-        posts = PostModel.get_all_posts_paginated(page, per_page)
+    # Get featured post, introduction post and the page of remaining posts in one query
+    home = PostModel.home_page_bundle(page, per_page)
+    featured_post = home['featured_post']
+    introduction_post = home['introduction_post']
+    total_posts = home['total_posts']
+    posts = home['posts']
     
     # Calculate pagination info
-    total_pages = (total_posts + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
-    prev_page = page - 1 if has_prev else None
-    next_page = page + 1 if has_next else None
+    pagination = Pagination(page, per_page, total_posts)
     
     # Get popular tags for sidebar
     popular_tags = TagModel.get_popular_tags(8)
@@ -57,13 +41,7 @@ def index():
                          posts=posts, 
                          featured_post=featured_post,
                          introduction_post=introduction_post,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_page=prev_page,
-                         next_page=next_page,
-                         per_page=per_page,
+                         pagination=pagination,
                          popular_tags=popular_tags,
                          random_quote=random_quote)
 
@@ -73,35 +51,23 @@ def index():
 def articles():
     """Articles page with pagination."""
     # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    
     # Responsive pagination - 6 for larger devices, 3 for mobile
     # We'll use JavaScript to determine this, but default to 6
-    per_page = request.args.get('per_page', 6, type=int)
-    if per_page not in [3, 6]:
-        per_page = 6  # Default fallback
+    page, per_page = paginate_args(6, (3, 6))
     
-    # Get paginated articles
-    articles = PostModel.get_articles_paginated(page, per_page)
+    # Get paginated articles, skipping the fetch when the page is past the end
     total_articles = PostModel.count_articles()
+    if (page - 1) * per_page >= total_articles:
+        articles = []
+    else:
+        articles = PostModel.get_articles_paginated(page, per_page)
     
     # Calculate pagination info
-    total_pages = (total_articles + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
-    prev_page = page - 1 if has_prev else None
-    next_page = page + 1 if has_next else None
+    pagination = Pagination(page, per_page, total_articles)
     
     return render_template('articles.html', 
                          articles=articles,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_page=prev_page,
-                         next_page=next_page,
-                         per_page=per_page,
-                         total_articles=total_articles)
+                         pagination=pagination)
 
 
 @main.route('/articles/category/<category_slug>')
@@ -113,34 +79,22 @@ def articles_by_category(category_slug):
         return render_template('404.html'), 404
     
     # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    
     # Responsive pagination - 6 for larger devices, 3 for mobile
-    per_page = request.args.get('per_page', 6, type=int)
-    if per_page not in [3, 6]:
-        per_page = 6  # Default fallback
+    page, per_page = paginate_args(6, (3, 6))
     
-    # Get paginated articles for this category
-    articles = PostModel.get_articles_paginated(page, per_page, category['id'])
+    # Get paginated articles for this category, skipping the fetch when the page is past the end
     total_articles = PostModel.count_articles(category['id'])
+    if (page - 1) * per_page >= total_articles:
+        articles = []
+    else:
+        articles = PostModel.get_articles_paginated(page, per_page, category['id'])
     
     # Calculate pagination info
-    total_pages = (total_articles + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
-    prev_page = page - 1 if has_prev else None
-    next_page = page + 1 if has_next else None
+    pagination = Pagination(page, per_page, total_articles)
     
     return render_template('articles.html', 
                          articles=articles,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_page=prev_page,
-                         next_page=next_page,
-                         per_page=per_page,
-                         total_articles=total_articles,
+                         pagination=pagination,
                          category=category)
 
 
@@ -158,18 +112,32 @@ def contact():
         
         # Save message to database
         try:
-            ContactModel.save_message(name, email, subject, message)
+            email_config = EmailConfigModel.get_config()
             
-            # Log the contact message submission
-            ActivityLogModel.log_activity(
-                admin_username='system',
-                action='Contact Message Received',
-                details=f'New contact message from {name} ({email}) - Subject: "{subject}"',
-                ip_address=request.remote_addr
-            )
+            # Save the message and its log entries in a single commit
+            with transaction():
+                ContactModel.save_message(name, email, subject, message, commit=False)
+                
+                # Log the contact message submission
+                ActivityLogModel.log_activity(
+                    admin_username='system',
+                    action='Contact Message Received',
+                    details=f'New contact message from {name} ({email}) - Subject: "{subject}"',
+                    ip_address=request.remote_addr,
+                    background=False
+                )
+                
+                if not email_config:
+                    # No email config - log this
+                    ActivityLogModel.log_activity(
+                        admin_username='system',
+                        action='Email Config Missing',
+                        details='Contact message received but no email configuration found for notifications',
+                        ip_address=request.remote_addr,
+                        background=False
+                    )
             
-            # Try to send email if configured
-            email_config = EmailConfigModel.get_config()
+            # Try to send email if configured (outside the transaction so SMTP doesn't hold the write lock)
             if email_config:
                 try:
                     send_contact_email(email_config, name, email, subject, message)
@@ -180,7 +148,6 @@ def contact():
                         details=f'Contact form notification sent to admin for message from {name}',
                         ip_address=request.remote_addr
                     )
-                    flash('Thank you for your message! We\'ll get back to you soon.', 'success')
                 except Exception as e:
                     # Email failed but message was saved - log the failure
                     ActivityLogModel.log_activity(
@@ -189,17 +156,8 @@ def contact():
                         details=f'Failed to send email notification for contact message from {name}: {str(e)}',
                         ip_address=request.remote_addr
                     )
-                    flash('Thank you for your message! We\'ll get back to you soon.', 'success')
-            else:
-                # No email config - log this
-                ActivityLogModel.log_activity(
-                    admin_username='system',
-                    action='Email Config Missing',
-                    details='Contact message received but no email configuration found for notifications',
-                    ip_address=request.remote_addr
-                )
-                flash('Thank you for your message! We\'ll get back to you soon.', 'success')
             
+            flash('Thank you for your message! We\'ll get back to you soon.', 'success')
             return redirect(url_for('main.contact'))
             
         except Exception as e:
@@ -217,12 +175,10 @@ def about():
 
 def send_contact_email(config, name, email, subject, message):
     """Send contact form email notification to admin."""
-    from datetime import datetime
-    import logging
-    
-    # Set up logging for debugging
-    logging.basicConfig(level=logging.DEBUG)
-    logger = logging.getLogger(__name__)
+    # Only the contact POST path needs the mail modules, so load them here
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
     
     # Validate config object
     if not config:
@@ -247,6 +203,9 @@ def send_contact_email(config, name, email, subject, message):
         
         logger.debug(f"Config {attr}: {'***' if 'password' in attr else value}")
     
+    # Timestamp shared by the plain text and HTML bodies
+    received = datetime.now()
+    
     # Create message
     msg = MIMEMultipart('alternative')
     msg['From'] = config['from_email']
@@ -264,7 +223,7 @@ SENDER INFORMATION:
 👤 Name: {name}
 📧 Email: {email}
 📝 Subject: {subject}
-🕒 Received: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+🕒 Received: {received.strftime('%Y-%m-%d %H:%M:%S')}
 
 MESSAGE:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -321,7 +280,7 @@ This notification was sent automatically by Japan's History Blog.
             </div>
             
             <div class="info-row">
-                <strong>🕒 Received:</strong> {datetime.now().strftime('%B %d, %Y at %H:%M:%S')}
+                <strong>🕒 Received:</strong> {received.strftime('%B %d, %Y at %H:%M:%S')}
             </div>
             
             <div class="message-box">
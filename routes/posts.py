@@ -1,39 +1,79 @@
 """
 Post-related routes for the Story Hub application.
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from models import PostModel, CategoryModel, PostTemplateModel, ActivityLogModel
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response, stream_template, get_flashed_messages
+from flask_wtf.csrf import generate_csrf
+from models import PostModel, CategoryModel, PostTemplateModel, ActivityLogModel, get_listing_version
 from forms import PostForm, DeleteForm
-from utils import admin_required, generate_unique_slug, save_uploaded_file, delete_file, parse_tags
+from utils import admin_required, generate_unique_slug, save_uploaded_file, delete_file, parse_tags, is_admin_logged_in
 from flask import current_app
+import hashlib
 import os
+import time
 from datetime import datetime
 
 posts = Blueprint('posts', __name__)
 
 
+def _post_etag(post):
+    """Get the ETag for a rendered post page.
+    
+    Besides the post itself the page shows related posts, its category and
+    featured state, covered by the listing version, and the session's CSRF
+    token. The embedded token is signed with a timestamp and expires, so the
+    tag also rolls over every tenth of the CSRF time limit.
+    """
+    generate_csrf()  # Make sure the session holds the token before reading it
+    parts = [post['id'], post['updated_at'], get_listing_version(),
+             session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))]
+    time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if time_limit:
+        parts.append(int(time.time() // (time_limit / 10)))
+    return hashlib.blake2b(':'.join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def _stream_preview(**context):
+    """Stream a post preview so the browser can start on large drafts sooner."""
+    # The session is saved before a streamed body renders, so touch it up front:
+    # store the CSRF token and consume pending flash messages now.
+    generate_csrf()
+    get_flashed_messages(with_categories=True)
+    return stream_template('post.html', preview=True, **context)
+
+
 @posts.route('/post/<slug>')
 def view_post_by_slug(slug):
     """View a post by its slug."""
-    post = PostModel.get_post_by_slug(slug)
+    post, tags = PostModel.get_post_with_tags_by_slug(slug)
     if post is None:
         flash('Post not found.', 'error')
         return redirect(url_for('main.index'))
     
-    # Get tags for this post
-    tags = PostModel.get_post_tags(post['id'])
+    # Let browsers revalidate unchanged posts instead of re-rendering them.
+    # Admin pages and pages with pending flash messages are never reused.
+    cacheable = not is_admin_logged_in() and '_flashes' not in session
+    etag = _post_etag(post) if cacheable else None
+    if cacheable and etag in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
     
     # Get related posts
     related_posts = PostModel.get_related_posts(post['id'], limit=4)
     
     form = DeleteForm()
-    return render_template('post.html', post=post, tags=tags, related_posts=related_posts, form=form)
+    response = make_response(render_template('post.html', post=post, tags=tags, related_posts=related_posts, form=form))
+    if cacheable:
+        response.set_etag(etag)
+        # Private because the page embeds a per-session CSRF token
+        response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
 
 
 @posts.route('/post/<int:post_id>')
 def view_post(post_id):
     """View a post by ID (redirects to slug if available)."""
-    post = PostModel.get_post_by_id(post_id)
+    post, tags = PostModel.get_post_with_tags_by_id(post_id)
     if post is None:
         flash('Post not found.', 'error')
         return redirect(url_for('main.index'))
@@ -42,9 +82,6 @@ def view_post(post_id):
     if post['slug']:
         return redirect(url_for('posts.view_post_by_slug', slug=post['slug']), code=301)
     
-    # Get tags for this post
-    tags = PostModel.get_post_tags(post['id'])
-    
     # Get related posts
     related_posts = PostModel.get_related_posts(post['id'], limit=4)
     
@@ -95,7 +132,7 @@ def create_post():
                 preview_tags = []
             
             form = DeleteForm()
-            return render_template('post.html', post=preview_post, tags=preview_tags, form=form, preview=True)
+            return _stream_preview(post=preview_post, tags=preview_tags, form=form)
         
         title = form.title.data
         content = form.content.data
@@ -144,21 +181,20 @@ def create_post():
         canonical_url = form.canonical_url.data if form.canonical_url.data else None
         
         # Create the post
-        PostModel.create_post(title, content, excerpt, image_filename, post_type, slug, 
-                            image_position_x, image_position_y, category_id, status, publish_date, template_id,
-                            meta_description, meta_keywords, canonical_url)
+        new_post_id = PostModel.create_post(title, content, excerpt, image_filename, post_type, slug, 
+                                            image_position_x, image_position_y, category_id, status, publish_date, template_id,
+                                            meta_description, meta_keywords, canonical_url)
         
-        # Get the newly created post to add tags
-        new_post = PostModel.get_post_by_slug(slug)
-        if new_post and form.tags.data:
+        # Add tags to the newly created post
+        if form.tags.data:
             tag_list = parse_tags(form.tags.data)
-            PostModel.add_tags_to_post(new_post['id'], tag_list)
+            PostModel.add_tags_to_post(new_post_id, tag_list)
         
         # Log post creation activity
         ActivityLogModel.log_activity(
             admin_username=session.get('admin_username', 'unknown'),
             action='Post Created',
-            details=f'Created new post: "{title}" (ID: {new_post["id"] if new_post else "unknown"}, Status: {status})',
+            details=f'Created new post: "{title}" (ID: {new_post_id}, Status: {status})',
             ip_address=request.remote_addr
         )
         
@@ -172,7 +208,6 @@ def create_post():
 @admin_required
 def edit_post(post_id):
     """Edit an existing post."""
-    print(f"=== EDIT POST CALLED: {request.method} for post {post_id} ===")
     post = PostModel.get_post_by_id(post_id)
     
     if post is None:
@@ -209,19 +244,7 @@ def edit_post(post_id):
         form.canonical_url.data = post.get('canonical_url', '')
         
         # Get existing tags
-        existing_tags = PostModel.get_post_tags(post_id)
-        if existing_tags:
-            form.tags.data = ', '.join([tag['name'] for tag in existing_tags])
-
-    # Debug form submission (avoiding Unicode issues)
-    if request.method == 'POST':
-        print(f"Form submitted. Validation result: {form.validate()}")
-        if form.content.data:
-            print(f"Content received, length: {len(form.content.data)}")
-        else:
-            print("Content field is empty!")
-        if form.errors:
-            print(f"Form has errors: {list(form.errors.keys())}")
+        form.tags.data = PostModel.get_post_tags_csv(post_id) or ''
 
     if form.validate_on_submit():
         # Check if this is a preview request
@@ -252,7 +275,7 @@ def edit_post(post_id):
                 preview_tags = PostModel.get_post_tags(post_id)
             
             form = DeleteForm()
-            return render_template('post.html', post=preview_post, tags=preview_tags, form=form, preview=True)
+            return _stream_preview(post=preview_post, tags=preview_tags, form=form)
         
         title = form.title.data
         content = form.content.data
@@ -260,11 +283,14 @@ def edit_post(post_id):
         post_type = 'article'  # All posts are now articles
         
         image_filename = post['image_filename']
-        if form.image.data:
+        new_image = None
+        if form.image.data and form.image.data.filename:
+            # Save new image first so the old one survives a failed save
+            new_image = save_uploaded_file(form.image.data, current_app.config['UPLOAD_FOLDER'])
+        if new_image:
             # Delete old image
             delete_file(image_filename)
-            # Save new image
-            image_filename = save_uploaded_file(form.image.data, current_app.config['UPLOAD_FOLDER'])
+            image_filename = new_image
         
         # Generate new slug if title changed
         if title != post['title']:
@@ -373,15 +399,13 @@ def delete_post(post_id):
 @admin_required
 def preview_post(post_id):
     """Preview a post (including drafts)."""
-    post = PostModel.get_post_by_id(post_id)
+    post, tags = PostModel.get_post_with_tags_by_id(post_id)
     if post is None:
         flash('Post not found.', 'error')
         return redirect(url_for('main.index'))
     
-    # Get tags for this post
-    tags = PostModel.get_post_tags(post['id'])
     form = DeleteForm()
-    return render_template('post.html', post=post, tags=tags, form=form, preview=True)
+    return _stream_preview(post=post, tags=tags, form=form)
 
 
 @posts.route('/api/template/<int:template_id>')
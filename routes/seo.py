@@ -1,121 +1,58 @@
 """
 SEO-related routes for the Story Hub application.
 """
-from flask import Blueprint, Response, url_for, render_template_string
-from models import PostModel, TagModel
-from datetime import datetime
+import hashlib
+from flask import Blueprint, Response, url_for, current_app, stream_with_context, request
+from markupsafe import escape
+from models import PostModel, TagModel, CategoryModel, get_listing_version
+from extensions import cache
+from utils import strip_html_tags
+from datetime import date, datetime
+from urllib.parse import quote, quote_plus
 
 seo = Blueprint('seo', __name__)
 
-
-@seo.route('/sitemap.xml')
-def sitemap():
-    """Generate XML sitemap for search engines."""
-    
-    # Get all published posts
-    posts = PostModel.get_articles_paginated(page=1, per_page=1000)
-    
-    # Get all tags
-    tags = TagModel.get_all_tags()
-    
-    # Get categories
-    from models import CategoryModel
-    categories = CategoryModel.get_categories_with_posts()
-    
-    # Generate sitemap XML
-    sitemap_xml = """<?xml version="1.0" encoding="UTF-8"?>
+_SITEMAP_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-    <!-- Home page -->
-    <url>
-        <loc>{{ url_for('main.index', _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>daily</changefreq>
-        <priority>1.0</priority>
-    </url>
-    
-    
-    <!-- Articles page -->
-    <url>
-        <loc>{{ url_for('main.articles', _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.8</priority>
-    </url>
-    
-    <!-- Search page -->
-    <url>
-        <loc>{{ url_for('search.search_posts', _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>monthly</changefreq>
-        <priority>0.6</priority>
-    </url>
-    
-    <!-- All tags page -->
-    <url>
-        <loc>{{ url_for('search.all_tags', _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.7</priority>
-    </url>
-    
-    <!-- Individual posts -->
-    {% for post in posts %}
-    <url>
-        <loc>{{ url_for('posts.view_post_by_slug', slug=post.slug, _external=True) if post.slug else url_for('posts.view_post', post_id=post.id, _external=True) }}</loc>
-        <lastmod>{{ post.updated_at or post.created_at }}</lastmod>
-        <changefreq>monthly</changefreq>
-        <priority>{% if post.featured %}0.9{% else %}0.7{% endif %}</priority>
-    </url>
-    {% endfor %}
-    
-    <!-- Category pages -->
-    {% for category in categories %}
-    <url>
-        <loc>{{ url_for('main.articles', category=category.slug, _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.7</priority>
-    </url>
-    {% endfor %}
-    
-    <!-- Tag pages -->
-    {% for tag in tags %}
-    <url>
-        <loc>{{ url_for('search.posts_by_tag', slug=tag.slug, _external=True) }}</loc>
-        <lastmod>{{ last_modified }}</lastmod>
-        <changefreq>weekly</changefreq>
-        <priority>0.6</priority>
+"""
+
+_SITEMAP_URL = """    <url>
+        <loc>{loc}</loc>
+        <lastmod>{lastmod}</lastmod>
+        <changefreq>{changefreq}</changefreq>
+        <priority>{priority}</priority>
     </url>
-    {% endfor %}
-</urlset>"""
-    
-    # Get the most recent post update time
-    last_modified = datetime.now().strftime('%Y-%m-%d')
-    if posts:
-        most_recent = max(posts, key=lambda p: p['updated_at'] or p['created_at'])
-        last_modified = (most_recent['updated_at'] or most_recent['created_at'])[:10]
-    
-    # Render the sitemap
-    rendered_sitemap = render_template_string(
-        sitemap_xml,
-        posts=posts,
-        tags=tags,
-        categories=categories,
-        last_modified=last_modified
-    )
-    
-    return Response(rendered_sitemap, mimetype='application/xml')
+"""
+
+_RSS_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+    <channel>
+        <title>Story Hub - Latest Posts</title>
+        <link>{home}</link>
+        <description>Discover insightful articles about Japanese history and culture from our community of writers.</description>
+        <language>en-us</language>
+        <lastBuildDate>{build_date}</lastBuildDate>
+        <atom:link href="{self_url}" rel="self" type="application/rss+xml" />
+"""
 
+_RSS_ITEM = """        <item>
+            <title>{title}</title>
+            <link>{link}</link>
+            <description><![CDATA[{description}]]></description>
+            <guid>{link}</guid>
+            <pubDate>{pub_date}</pubDate>
+            <category>Article</category>
+{enclosure}        </item>
+"""
 
-@seo.route('/robots.txt')
-def robots():
-    """Generate robots.txt file for search engines."""
-    
-    robots_txt = """User-agent: *
+_RSS_ENCLOSURE = """            <enclosure url="{url}" type="image/jpeg" />
+"""
+
+_ROBOTS_TXT = """User-agent: *
 Allow: /
 
 # Sitemap
-Sitemap: {{ url_for('seo.sitemap', _external=True) }}
+Sitemap: {sitemap}
 
 # Crawl-delay for polite crawling
 Crawl-delay: 1
@@ -131,80 +68,16 @@ Allow: /articles
 Allow: /search
 Allow: /tags
 Allow: /post/
-Allow: /tag/
-"""
-    
-    rendered_robots = render_template_string(robots_txt)
-    return Response(rendered_robots, mimetype='text/plain')
-
+Allow: /tag/"""
 
-@seo.route('/.well-known/security.txt')
-def security():
-    """Generate security.txt file for security researchers."""
-    
-    security_txt = """Contact: mailto:security@storyhub.com
+_SECURITY_TXT = """Contact: mailto:security@storyhub.com
 Expires: 2025-12-31T23:59:59.000Z
 Preferred-Languages: en
-Canonical: {{ url_for('seo.security', _external=True) }}
-Policy: {{ url_for('main.index', _external=True) }}/security-policy
-"""
-    
-    rendered_security = render_template_string(security_txt)
-    return Response(rendered_security, mimetype='text/plain')
-
-
-@seo.route('/feed.xml')
-def rss_feed():
-    """Generate RSS feed for the blog."""
-    
-    # Get recent published posts
-    posts = PostModel.get_articles_paginated(page=1, per_page=20)  # Limit to 20 most recent published posts
-    
-    rss_xml = """<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
-    <channel>
-        <title>Story Hub - Latest Posts</title>
-        <link>{{ url_for('main.index', _external=True) }}</link>
-        <description>Discover insightful articles about Japanese history and culture from our community of writers.</description>
-        <language>en-us</language>
-        <lastBuildDate>{{ build_date }}</lastBuildDate>
-        <atom:link href="{{ url_for('seo.rss_feed', _external=True) }}" rel="self" type="application/rss+xml" />
-        
-        {% for post in posts %}
-        <item>
-            <title>{{ post.title }}</title>
-            <link>{{ url_for('posts.view_post_by_slug', slug=post.slug, _external=True) if post.slug else url_for('posts.view_post', post_id=post.id, _external=True) }}</link>
-            <description><![CDATA[{{ post.excerpt if post.excerpt else (post.content|striptags)[:200] }}]]></description>
-            <guid>{{ url_for('posts.view_post_by_slug', slug=post.slug, _external=True) if post.slug else url_for('posts.view_post', post_id=post.id, _external=True) }}</guid>
-            <pubDate>{{ post.created_at }}</pubDate>
-            <category>Article</category>
-            {% if post.image_filename %}
-            <enclosure url="{{ url_for('static', filename='uploads/' + post.image_filename, _external=True) }}" type="image/jpeg" />
-            {% endif %}
-        </item>
-        {% endfor %}
-    </channel>
-</rss>"""
-    
-    build_date = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
-    
-    rendered_rss = render_template_string(
-        rss_xml,
-        posts=posts,
-        build_date=build_date
-    )
-    
-    return Response(rendered_rss, mimetype='application/rss+xml')
-
+Canonical: {canonical}
+Policy: {home}/security-policy"""
 
-@seo.route('/feed.atom')
-def atom_feed():
-    """Generate Atom feed for the blog."""
-    
-    # Get recent published posts
-    posts = PostModel.get_articles_paginated(page=1, per_page=20)  # Limit to 20 most recent published posts
-    
-    atom_xml = """<?xml version="1.0" encoding="UTF-8"?>
+# Compiled once per app by _compiled() rather than on every request
+_ATOM_XML = """<?xml version="1.0" encoding="UTF-8"?>
 <feed xmlns="http://www.w3.org/2005/Atom">
     <title>Story Hub - Latest Posts</title>
     <link href="{{ url_for('main.index', _external=True) }}" rel="alternate"/>
@@ -230,11 +103,216 @@ def atom_feed():
     </entry>
     {% endfor %}
 </feed>"""
+
+
+_today_cache = (None, None)
+
+
+def _today_str():
+    """Get today's date as YYYY-MM-DD, formatting it once per day."""
+    global _today_cache
+    today = date.today()
+    if _today_cache[0] != today:
+        _today_cache = (today, today.strftime('%Y-%m-%d'))
+    return _today_cache[1]
+
+
+# Characters url_for leaves unescaped in path segments and query values
+_PATH_SAFE = "!$&'()*+,/:;=@"
+_QUERY_SAFE = "!$'()*,/:;?@"
+
+
+def _url_prefix(endpoint, **values):
+    """Get an endpoint's external URL up to and including its last '/'.
+    
+    Feeds build one URL per item, so they resolve the route once with a
+    placeholder and append each item's escaped segment to the prefix.
+    """
+    return url_for(endpoint, _external=True, **values).rpartition('/')[0] + '/'
+
+
+def _post_url(prefix, post):
+    """Get the external URL for a post under `prefix`, preferring its slug."""
+    return prefix + quote(str(post['slug'] or post['id']), safe=_PATH_SAFE)
+
+
+def _sitemap_url(loc, lastmod, changefreq, priority):
+    """Build one sitemap <url> entry."""
+    return _SITEMAP_URL.format(loc=escape(loc), lastmod=escape(lastmod), changefreq=changefreq, priority=priority)
+
+
+def _host_cache_key(*args, **kwargs):
+    """Cache key for SEO views; external URLs depend on the requested host."""
+    return f'seo:{request.host}{request.path}'
+
+
+def _cached_document(name, mimetype, build, timeout=3600):
+    """Serve a generated document cached until posts, tags or categories change.
+    
+    The document is keyed on the listing version, which database triggers
+    bump on every post, tag and category write so all workers agree on it,
+    and on the latest post update or go-live time, which moves when a
+    scheduled post is published. On a cache miss the chunks from
+    ``build(last_modified)`` are streamed to the client and stored once
+    complete. Clients revalidate with ETag/Last-Modified.
+    """
+    last_modified = PostModel.get_last_modified()
+    signature = f'{get_listing_version()}:{last_modified}'
+    etag = hashlib.blake2b(f'{name}:{signature}'.encode(), digest_size=8).hexdigest()
+    
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        key = f'seo:{name}:{request.host}:{signature}'
+        body = cache.get(key)
+        if body is not None:
+            response = Response(body, mimetype=mimetype)
+        else:
+            def generate():
+                parts = []
+                for part in build(last_modified):
+                    parts.append(part)
+                    yield part
+                cache.set(key, ''.join(parts), timeout=timeout)
+            
+            response = Response(stream_with_context(generate()), mimetype=mimetype)
+    
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = datetime.fromisoformat(last_modified)
+    return response
+
+
+def _compiled(source):
+    """Get the compiled template for an SEO source string, compiling it on first use."""
+    templates = current_app.extensions.setdefault('seo_templates', {})
+    template = templates.get(source)
+    if template is None:
+        template = templates[source] = current_app.jinja_env.from_string(source)
+    return template
+
+
+def _sitemap_parts(last_modified):
+    """Yield the sitemap XML one entry at a time."""
+    
+    # Get all published posts
+    posts = PostModel.get_articles_paginated(page=1, per_page=1000)
+    
+    # Get all tags
+    tags = TagModel.get_all_tags()
+    
+    # Get categories
+    categories = CategoryModel.get_categories_with_posts()
+    
+    # Use the most recent post update time
+    last_modified = last_modified[:10] if last_modified else _today_str()
+    
+    post_prefix = _url_prefix('posts.view_post', post_id=0)
+    category_prefix = url_for('main.articles', _external=True) + '?category='
+    tag_prefix = _url_prefix('search.posts_by_tag', slug='_')
+    
+    # Build the sitemap directly; it is plain XML repeated per entry
+    yield _SITEMAP_HEADER
+    yield _sitemap_url(url_for('main.index', _external=True), last_modified, 'daily', '1.0')
+    yield _sitemap_url(url_for('main.articles', _external=True), last_modified, 'weekly', '0.8')
+    yield _sitemap_url(url_for('search.search_posts', _external=True), last_modified, 'monthly', '0.6')
+    yield _sitemap_url(url_for('search.all_tags', _external=True), last_modified, 'weekly', '0.7')
+    
+    # Individual posts
+    for post in posts:
+        yield _sitemap_url(_post_url(post_prefix, post), post['updated_at'] or post['created_at'],
+                           'monthly', '0.9' if post['featured'] else '0.7')
+    
+    # Category pages
+    for category in categories:
+        yield _sitemap_url(category_prefix + quote_plus(category['slug'], safe=_QUERY_SAFE),
+                           last_modified, 'weekly', '0.7')
+    
+    # Tag pages
+    for tag in tags:
+        yield _sitemap_url(tag_prefix + quote(tag['slug'], safe=_PATH_SAFE),
+                           last_modified, 'weekly', '0.6')
+    
+    yield '</urlset>'
+
+
+@seo.route('/sitemap.xml')
+def sitemap():
+    """Generate XML sitemap for search engines."""
+    return _cached_document('sitemap', 'application/xml', _sitemap_parts)
+
+
+@seo.route('/robots.txt')
+@cache.cached(timeout=86400, make_cache_key=_host_cache_key)
+def robots():
+    """Generate robots.txt file for search engines."""
+    
+    body = _ROBOTS_TXT.format(sitemap=url_for('seo.sitemap', _external=True)).encode()
+    return Response(body, mimetype='text/plain')
+
+
+@seo.route('/.well-known/security.txt')
+@cache.cached(timeout=86400, make_cache_key=_host_cache_key)
+def security():
+    """Generate security.txt file for security researchers."""
+    
+    body = _SECURITY_TXT.format(
+        canonical=url_for('seo.security', _external=True),
+        home=url_for('main.index', _external=True)
+    ).encode()
+    return Response(body, mimetype='text/plain')
+
+
+def _rss_parts(last_modified):
+    """Yield the RSS feed XML one item at a time."""
+    
+    # Get recent published posts
+    posts = PostModel.get_articles_paginated(page=1, per_page=20)  # Limit to 20 most recent published posts
+    
+    build_date = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
+    post_prefix = _url_prefix('posts.view_post', post_id=0)
+    upload_prefix = url_for('static', filename='uploads/', _external=True)
+    
+    yield _RSS_HEADER.format(
+        home=escape(url_for('main.index', _external=True)),
+        build_date=build_date,
+        self_url=escape(url_for('seo.rss_feed', _external=True))
+    )
+    
+    for post in posts:
+        enclosure = ''
+        if post['image_filename']:
+            enclosure = _RSS_ENCLOSURE.format(
+                url=escape(upload_prefix + quote(post['image_filename'], safe=_PATH_SAFE))
+            )
+        yield _RSS_ITEM.format(
+            title=escape(post['title']),
+            link=escape(_post_url(post_prefix, post)),
+            description=escape(post['excerpt'] if post['excerpt'] else strip_html_tags(post['content'])[:200]),
+            pub_date=escape(post['created_at']),
+            enclosure=enclosure
+        )
+    
+    yield """    </channel>
+</rss>"""
+
+
+@seo.route('/feed.xml')
+def rss_feed():
+    """Generate RSS feed for the blog."""
+    return _cached_document('rss', 'application/rss+xml', _rss_parts)
+
+
+@seo.route('/feed.atom')
+def atom_feed():
+    """Generate Atom feed for the blog."""
+    
+    # Get recent published posts
+    posts = PostModel.get_articles_paginated(page=1, per_page=20)  # Limit to 20 most recent published posts
     
     build_date_iso = datetime.now().isoformat() + 'Z'
     
-    rendered_atom = render_template_string(
-        atom_xml,
+    rendered_atom = _compiled(_ATOM_XML).render(
         posts=posts,
         build_date_iso=build_date_iso
     )
@@ -1,17 +1,87 @@
 """
 Utility functions for the Story Hub application.
 """
+import math
 import os
-from functools import wraps
-from flask import session, flash, redirect, url_for, current_app
+import re
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from itertools import chain, islice
+from flask import session, flash, redirect, url_for, current_app, g, request
 from slugify import slugify
 from models import PostModel
 
+ALLOWED_EXTENSIONS = frozenset(('png', 'jpg', 'jpeg', 'gif', 'webp'))
+
+# Copy uploads to disk in 1MB chunks instead of Werkzeug's default 16KB
+_UPLOAD_BUFFER_SIZE = 1024 * 1024
+
+# Upper bound on the page number to keep OFFSET scans bounded
+MAX_PAGE = 10000
+
+# A tag is a run of non-separator characters, without surrounding whitespace
+_TAG_RE = re.compile(r'[^,;\s](?:[^,;]*[^,;\s])?')
+
+_HTML_TAG_RE = re.compile('<[^<]+?>')
+
+# Lowercased text slugify() would only split on separators; handled without it
+_PLAIN_SLUG_TEXT_RE = re.compile(r'[a-z0-9\s_-]*', re.ASCII)
+_SLUG_SEPARATOR_RE = re.compile('[^a-z0-9]+')
+
+_DEFAULT_KEYWORDS = ('blog', 'Japan history', 'articles', 'Japanese culture', 'writing')
+
+
+@dataclass(frozen=True)
+class Pagination:
+    """Page position within a listing of `total` items."""
+    page: int
+    per_page: int
+    total: int
+    
+    @property
+    def total_pages(self):
+        return (self.total + self.per_page - 1) // self.per_page
+    
+    @property
+    def has_prev(self):
+        return self.page > 1
+    
+    @property
+    def has_next(self):
+        return self.page < self.total_pages
+    
+    @property
+    def prev_page(self):
+        return self.page - 1 if self.has_prev else None
+    
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+
+def paginate_args(default_per_page, allowed_per_page):
+    """Read and clamp the page/per_page query parameters."""
+    page = request.args.get('page', 1, type=int) or 1
+    page = 1 if page < 1 else page
+    page = min(page, MAX_PAGE)
+    
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    if per_page not in allowed_per_page:
+        per_page = default_per_page  # Default fallback
+    
+    return page, per_page
+
+
+def _file_extension(filename):
+    """Get a filename's lowercased extension, or '' if it has none."""
+    _, dot, ext = filename.rpartition('.')
+    return ext.lower() if dot else ''
+
 
 def allowed_file(filename):
     """Check if uploaded file has allowed extension."""
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return _file_extension(filename) in ALLOWED_EXTENSIONS
 
 
 def admin_required(f):
@@ -30,16 +100,26 @@ def is_admin_logged_in():
     return session.get('admin_logged_in', False)
 
 
+def _slugify(text):
+    """slugify() with a fast path for plain ASCII words and separators."""
+    lowered = text.lower()
+    if _PLAIN_SLUG_TEXT_RE.fullmatch(lowered):
+        return _SLUG_SEPARATOR_RE.sub('-', lowered).strip('-')
+    return slugify(text)
+
+
 def generate_unique_slug(title, post_id=None):
     """Generate a unique slug for a post title."""
-    base_slug = slugify(title)
+    base_slug = _slugify(title)
     if not base_slug:
         base_slug = 'untitled'
     
+    # Fetch every colliding slug at once and pick the first free suffix
+    taken = PostModel.get_colliding_slugs(base_slug, post_id)
     slug = base_slug
     counter = 1
     
-    while PostModel.slug_exists(slug, post_id):
+    while slug in taken:
         slug = f"{base_slug}-{counter}"
         counter += 1
     
@@ -50,28 +130,32 @@ def delete_file(filename):
     """Delete an uploaded file if it exists."""
     if filename:
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        if os.path.exists(file_path):
+        try:
             os.remove(file_path)
+        except FileNotFoundError:
+            pass
 
 
 def save_uploaded_file(file, upload_folder):
     """Save an uploaded file and return the filename."""
-    import uuid
-    from werkzeug.utils import secure_filename
-    
-    if file and allowed_file(file.filename):
-        # Generate unique filename
-        filename = secure_filename(str(uuid.uuid4()) + '.' + file.filename.rsplit('.', 1)[1].lower())
-        file.save(os.path.join(upload_folder, filename))
+    ext = _file_extension(file.filename) if file else ''
+    if ext in ALLOWED_EXTENSIONS:
+        # Generate unique filename; a hex UUID plus an allowed extension is already safe
+        filename = f"{uuid.uuid4().hex}.{ext}"
+        file.save(os.path.join(upload_folder, filename), buffer_size=_UPLOAD_BUFFER_SIZE)
         return filename
     return None
 
 
 
 
+@lru_cache(maxsize=4096)
 def generate_tag_slug(tag_name):
-    """Generate a URL-friendly slug for a tag."""
-    return slugify(tag_name.lower())
+    """Generate a URL-friendly slug for a tag.
+    
+    Tag names come from a small, frequently repeated set, so results are memoized.
+    """
+    return _slugify(tag_name.lower())
 
 
 def parse_tags(tag_string):
@@ -79,17 +163,26 @@ def parse_tags(tag_string):
     if not tag_string:
         return []
     
-    # Split by comma and clean up
-    tags = [tag.strip() for tag in tag_string.split(',')]
-    # Remove empty tags and duplicates while preserving order
-    seen = set()
-    result = []
-    for tag in tags:
-        if tag and tag.lower() not in seen:
-            result.append(tag)
-            seen.add(tag.lower())
+    # Extract already-stripped tags in one scan; the dict keeps the first
+    # spelling of each tag (case-insensitively) in insertion order
+    tags = {}
+    for tag in _TAG_RE.findall(tag_string):
+        tags.setdefault(tag.lower(), tag)
     
-    return result
+    return list(tags.values())
+
+
+def strip_html_tags(text):
+    """Remove HTML tags from text."""
+    return _HTML_TAG_RE.sub('', text)
+
+
+def _truncate_at_word(text, max_length):
+    """Shorten text to at most max_length, cutting at a space and adding '...'."""
+    if len(text) <= max_length:
+        return text
+    cut = text.rfind(' ', 0, max_length - 3)
+    return text[:cut if cut > 0 else max_length - 3] + '...'
 
 
 def generate_meta_description(content, excerpt=None, max_length=160):
@@ -97,50 +190,34 @@ def generate_meta_description(content, excerpt=None, max_length=160):
     if excerpt:
         description = excerpt.strip()
     else:
-        # Remove HTML tags and get plain text
-        import re
-        clean_content = re.sub('<[^<]+?>', '', content)
-        description = clean_content.strip()
+        # Remove HTML tags and get plain text; only the start can reach the output
+        description = _strip_tags(content, max_length + 1).strip()
+        if len(description) <= max_length:
+            description = _strip_tags(content).strip()
     
     # Truncate to max_length and add ellipsis if needed
-    if len(description) > max_length:
-        description = description[:max_length-3].rsplit(' ', 1)[0] + '...'
-    
-    return description
+    return _truncate_at_word(description, max_length)
 
 
 def generate_keywords(tags, additional_keywords=None):
     """Generate SEO keywords from tags and additional context."""
-    keywords = []
-    
-    # Add tags as keywords
-    if tags:
-        keywords.extend([tag.strip().lower() for tag in tags if tag.strip()])
+    if isinstance(additional_keywords, str):
+        additional_keywords = additional_keywords.split(',')
     
-    # Add additional keywords
-    if additional_keywords:
-        if isinstance(additional_keywords, str):
-            additional_keywords = [kw.strip() for kw in additional_keywords.split(',')]
-        keywords.extend([kw.strip().lower() for kw in additional_keywords if kw.strip()])
+    # Tags, then additional keywords, then the default site keywords, each
+    # stripped once; dict.fromkeys drops duplicates while preserving order
+    stripped = (kw.strip() for kw in chain(tags or (), additional_keywords or ()))
+    keywords = chain((kw.lower() for kw in stripped if kw), _DEFAULT_KEYWORDS)
     
-    # Add default site keywords
-    default_keywords = ['blog', 'Japan history', 'articles', 'Japanese culture', 'writing']
-    keywords.extend(default_keywords)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_keywords = []
-    for keyword in keywords:
-        if keyword not in seen:
-            unique_keywords.append(keyword)
-            seen.add(keyword)
-    
-    return ', '.join(unique_keywords[:20])  # Limit to 20 keywords
+    return ', '.join(islice(dict.fromkeys(keywords), 20))  # Limit to 20 keywords
 
 
 def get_canonical_url(request, slug=None, post_id=None):
     """Generate canonical URL for SEO."""
-    base_url = request.url_root.rstrip('/')
+    # The base is the same for every URL emitted during a request
+    base_url = getattr(g, '_canonical_base_url', None)
+    if base_url is None:
+        base_url = g._canonical_base_url = request.url_root.rstrip('/')
     
     if slug:
         return f"{base_url}/post/{slug}"
@@ -150,33 +227,55 @@ def get_canonical_url(request, slug=None, post_id=None):
         return request.url
 
 
+def _strip_tags(html_content, min_length=None):
+    """Remove HTML tags exactly as _HTML_TAG_RE does, in one forward scan.
+    
+    With `min_length`, scanning stops as soon as that many characters of text
+    have been kept, so the result is a prefix of the fully stripped text.
+    """
+    find = html_content.find
+    parts = []
+    kept = 0
+    pos = 0
+    start = find('<')
+    while start != -1:
+        end = find('>', start + 2)
+        if end == -1:
+            break
+        # Another '<' before the '>' means no tag starts here
+        nested = find('<', start + 1, end)
+        if nested != -1:
+            start = nested
+            continue
+        parts.append(html_content[pos:start])
+        kept += start - pos
+        pos = end + 1
+        if min_length is not None and kept >= min_length:
+            return ''.join(parts)
+        start = find('<', pos)
+    parts.append(html_content[pos:])
+    return ''.join(parts)
+
+
 def clean_html_for_seo(html_content, max_length=200):
     """Clean HTML content for SEO meta tags."""
-    import re
-    
-    # Remove HTML tags
-    clean_text = re.sub('<[^<]+?>', '', html_content)
-    
-    # Remove extra whitespace
-    clean_text = ' '.join(clean_text.split())
+    # Only the start of the content can reach the output, so clean a prefix
+    # of it first and fall back to the whole content if that comes up short
+    clean_text = ' '.join(_strip_tags(html_content, max_length * 2).split())
+    if len(clean_text) <= max_length:
+        clean_text = ' '.join(_strip_tags(html_content).split())
     
     # Truncate if needed
-    if len(clean_text) > max_length:
-        clean_text = clean_text[:max_length-3].rsplit(' ', 1)[0] + '...'
-    
-    return clean_text
+    return _truncate_at_word(clean_text, max_length)
 
 
 def calculate_reading_time(content, words_per_minute=200):
     """Calculate estimated reading time for content."""
-    import re
-    import math
-    
     if not content:
         return 1
     
     # Remove HTML tags
-    clean_content = re.sub('<[^<]+?>', '', content)
+    clean_content = strip_html_tags(content)
     
     # Count words
     words = len(clean_content.split())
@@ -187,22 +286,23 @@ def calculate_reading_time(content, words_per_minute=200):
     return max(1, reading_time)
 
 
+_CATEGORY_COLORS = {
+    'history': 'category-history',
+    'culture': 'category-culture',
+    'art': 'category-art',
+    'politics': 'category-politics',
+    'society': 'category-society',
+    'technology': 'category-technology'
+}
+
+
 def get_category_color_class(category_name):
     """Get CSS class for category color coding."""
     if not category_name:
         return 'category-default'
     
-    category_colors = {
-        'history': 'category-history',
-        'culture': 'category-culture', 
-        'art': 'category-art',
-        'politics': 'category-politics',
-        'society': 'category-society',
-        'technology': 'category-technology'
-    }
-    
     normalized_name = category_name.lower().replace(' ', '').replace('-', '')
-    return category_colors.get(normalized_name, 'category-default')
+    return _CATEGORY_COLORS.get(normalized_name, 'category-default')
 
 
 def truncate_content_smart(content, max_length=120):
@@ -211,8 +311,7 @@ def truncate_content_smart(content, max_length=120):
         return content or ''
     
     # Remove HTML tags first
-    import re
-    clean_content = re.sub('<[^<]+?>', '', content)
+    clean_content = strip_html_tags(content)
     
     if len(clean_content) <= max_length:
         return clean_content
@@ -261,49 +360,54 @@ def get_tag_size(post_count, max_count):
         return 'xs'
 
 
+_TAG_ICONS = {
+    'history': 'scroll',
+    'culture': 'torii-gate',
+    'art': 'palette',
+    'politics': 'university',
+    'society': 'users',
+    'technology': 'microchip',
+    'samurai': 'sword',
+    'temple': 'place-of-worship',
+    'festival': 'festival',
+    'food': 'utensils',
+    'anime': 'tv',
+    'manga': 'book',
+    'tradition': 'leaf',
+    'modern': 'city',
+    'ancient': 'monument',
+    'religion': 'prayer',
+    'war': 'shield-alt',
+    'peace': 'dove',
+    'economy': 'chart-line',
+    'education': 'graduation-cap',
+    'travel': 'plane',
+    'nature': 'tree',
+    'language': 'comment-alt',
+    'literature': 'feather-alt',
+    'music': 'music',
+    'dance': 'heart',
+    'martial-arts': 'fist-raised',
+    'zen': 'om',
+    'buddhism': 'dharmachakra',
+    'shinto': 'torii-gate'
+}
+
+
+@lru_cache(maxsize=1024)
 def get_tag_icon(tag_name):
-    """Get FontAwesome icon for a tag based on its name."""
-    tag_icons = {
-        'history': 'scroll',
-        'culture': 'torii-gate',
-        'art': 'palette',
-        'politics': 'university',
-        'society': 'users',
-        'technology': 'microchip',
-        'samurai': 'sword',
-        'temple': 'place-of-worship',
-        'festival': 'festival',
-        'food': 'utensils',
-        'anime': 'tv',
-        'manga': 'book',
-        'tradition': 'leaf',
-        'modern': 'city',
-        'ancient': 'monument',
-        'religion': 'prayer',
-        'war': 'shield-alt',
-        'peace': 'dove',
-        'economy': 'chart-line',
-        'education': 'graduation-cap',
-        'travel': 'plane',
-        'nature': 'tree',
-        'language': 'comment-alt',
-        'literature': 'feather-alt',
-        'music': 'music',
-        'dance': 'heart',
-        'martial-arts': 'fist-raised',
-        'zen': 'om',
-        'buddhism': 'dharmachakra',
-        'shinto': 'torii-gate'
-    }
+    """Get FontAwesome icon for a tag based on its name.
     
+    The partial-match scan depends only on the name, so results are memoized.
+    """
     normalized_name = tag_name.lower().replace(' ', '-').replace('_', '-')
     
     # Check for exact matches first
-    if normalized_name in tag_icons:
-        return tag_icons[normalized_name]
+    if normalized_name in _TAG_ICONS:
+        return _TAG_ICONS[normalized_name]
     
     # Check for partial matches
-    for key, icon in tag_icons.items():
+    for key, icon in _TAG_ICONS.items():
         if key in normalized_name or normalized_name in key:
             return icon
     
@@ -311,32 +415,38 @@ def get_tag_icon(tag_name):
     return 'tag'
 
 
+_TAG_DESCRIPTIONS = {
+    'history': "Explore {count} article{s} about Japanese historical events, periods, and influential figures.",
+    'culture': "Discover {count} post{s} exploring the rich cultural traditions and customs of Japan.",
+    'art': "Browse {count} article{s} showcasing Japanese artistic expressions and creative traditions.",
+    'politics': "Read {count} post{s} about Japan's political system, governance, and international relations.",
+    'society': "Learn from {count} article{s} about Japanese social structures, customs, and modern life.",
+    'technology': "Explore {count} post{s} covering Japan's technological innovations and digital culture.",
+    'samurai': "Delve into {count} article{s} about the legendary warrior class and their code of honor.",
+    'temple': "Visit {count} post{s} exploring Japan's sacred spaces and religious architecture.",
+    'festival': "Experience {count} article{s} about Japan's vibrant festivals and celebrations.",
+    'food': "Savor {count} post{s} about Japanese cuisine, cooking techniques, and food culture."
+}
+
+
+# Description keys normalized the same way as tag names, once at import
+_NORMALIZED_TAG_DESCRIPTIONS = {key.replace('-', ''): desc for key, desc in _TAG_DESCRIPTIONS.items()}
+
+
 def get_tag_description(tag_name, post_count):
     """Generate a description for a tag based on its name and usage."""
-    descriptions = {
-        'history': f"Explore {post_count} article{'s' if post_count != 1 else ''} about Japanese historical events, periods, and influential figures.",
-        'culture': f"Discover {post_count} post{'s' if post_count != 1 else ''} exploring the rich cultural traditions and customs of Japan.",
-        'art': f"Browse {post_count} article{'s' if post_count != 1 else ''} showcasing Japanese artistic expressions and creative traditions.",
-        'politics': f"Read {post_count} post{'s' if post_count != 1 else ''} about Japan's political system, governance, and international relations.",
-        'society': f"Learn from {post_count} article{'s' if post_count != 1 else ''} about Japanese social structures, customs, and modern life.",
-        'technology': f"Explore {post_count} post{'s' if post_count != 1 else ''} covering Japan's technological innovations and digital culture.",
-        'samurai': f"Delve into {post_count} article{'s' if post_count != 1 else ''} about the legendary warrior class and their code of honor.",
-        'temple': f"Visit {post_count} post{'s' if post_count != 1 else ''} exploring Japan's sacred spaces and religious architecture.",
-        'festival': f"Experience {post_count} article{'s' if post_count != 1 else ''} about Japan's vibrant festivals and celebrations.",
-        'food': f"Savor {post_count} post{'s' if post_count != 1 else ''} about Japanese cuisine, cooking techniques, and food culture."
-    }
-    
     normalized_name = tag_name.lower().replace(' ', '').replace('-', '').replace('_', '')
+    plural = 's' if post_count != 1 else ''
     
     # Check for exact matches
-    for key, desc in descriptions.items():
-        if key.replace('-', '') == normalized_name:
-            return desc
+    desc = _NORMALIZED_TAG_DESCRIPTIONS.get(normalized_name)
+    if desc is not None:
+        return desc.format(count=post_count, s=plural)
     
     # Check for partial matches
-    for key, desc in descriptions.items():
-        if key.replace('-', '') in normalized_name or normalized_name in key.replace('-', ''):
-            return desc
+    for key, desc in _NORMALIZED_TAG_DESCRIPTIONS.items():
+        if key in normalized_name or normalized_name in key:
+            return desc.format(count=post_count, s=plural)
     
     # Generic description
     if post_count == 1: